@@ -5,8 +5,13 @@ import time
 import os
 import json
 import sqlite3
+import tempfile
 import re
+import queue
 import urllib.parse
+import functools
+from collections import Counter, deque
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -57,7 +62,115 @@ PREDEFINED_OAUTH_CONFIG = {
     }
 }
 
+# --- PROFILING (OPT-IN, aktifkan via sidebar atau STREAM_PROFILE=1) ---
+PROFILING_DEFAULT = os.environ.get("STREAM_PROFILE") == "1"
+PROFILE_HISTORY = 20       # Jumlah rerun yang disimpan untuk export JSON
+PROFILE_BACKGROUND = 200   # Jumlah span thread ffmpeg yang disimpan per session
+PROFILE_DIR = Path(tempfile.gettempdir()) / "stream_profiles"
+_perf_local = threading.local()
+
+@contextmanager
+def perf_span(name, category):
+    # Thread rerun mencatat ke spans; thread ffmpeg ke buffer background milik session-nya
+    spans = getattr(_perf_local, 'spans', None)
+    background = getattr(_perf_local, 'background', None)
+    if spans is None and background is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        span = {"name": name, "category": category, "ms": (time.perf_counter() - start) * 1000}
+        if spans is not None:
+            spans.append(span)
+        else:
+            background.append({**span, "time": datetime.now().isoformat()})
+
+def run_with_perf(target, args, background):
+    """Jalankan target di thread background; span-nya masuk ke buffer session (None = tidak dicatat)."""
+    _perf_local.background = background
+    target(*args)
+
+def timed(category):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with perf_span(func.__name__, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def summarize_spans(spans, total_ms):
+    agg = {}
+    for s in spans:
+        row = agg.setdefault((s['category'], s['name']), {"category": s['category'], "name": s['name'], "count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        row['count'] += 1
+        row['total_ms'] += s['ms']
+        row['max_ms'] = max(row['max_ms'], s['ms'])
+    rows = sorted(agg.values(), key=lambda r: r['total_ms'], reverse=True)
+    for r in rows:
+        r['total_ms'], r['max_ms'] = round(r['total_ms'], 2), round(r['max_ms'], 2)
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "total_ms": round(total_ms, 2),
+        "untracked_ms": round(total_ms - sum(s['ms'] for s in spans), 2),
+        "spans": rows,
+    }
+
+def perf_begin_rerun():
+    enabled = st.session_state.get('perf_enabled', PROFILING_DEFAULT)
+    _perf_local.spans = [] if enabled else None
+    _perf_local.start = time.perf_counter()
+
+def perf_end_rerun():
+    spans = getattr(_perf_local, 'spans', None)
+    _perf_local.spans = None
+    if spans is None: return
+    report = summarize_spans(spans, (time.perf_counter() - _perf_local.start) * 1000)
+    history = st.session_state.setdefault('perf_history', [])
+    history.append(report)
+    del history[:-PROFILE_HISTORY]
+
+def frame_stack(frame):
+    stack = []
+    while frame:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+def run_sampling_profiler(sampler, seconds, interval=0.005):
+    """Sampling semua thread, hasil dalam format folded stack (flamegraph.pl / speedscope)."""
+    counts = Counter()
+    me = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    end = time.time() + seconds
+    try:
+        while time.time() < end:
+            for ident, frame in sys._current_frames().items():
+                if ident != me: counts[f"{names.get(ident, ident)};{frame_stack(frame)}"] += 1
+            time.sleep(interval)
+        data = "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+        PROFILE_DIR.mkdir(exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=PROFILE_DIR, delete=False, suffix=".folded",
+                                         prefix=f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}_") as f:
+            f.write(data)
+            path = f.name
+        # Hanya simpan profile terakhir per session
+        if sampler["path"] and os.path.exists(sampler["path"]): os.remove(sampler["path"])
+        sampler["path"], sampler["data"] = path, data
+    finally:
+        sampler["running"] = False
+
+def start_sampling_profiler(sampler, seconds):
+    if sampler["running"]: return False
+    sampler["running"] = True
+    threading.Thread(target=run_sampling_profiler, args=(sampler, seconds), daemon=True, name="sampling-profiler").start()
+    return True
+
 # --- DATABASE FUNCTIONS ---
+@timed("db")
 def init_database():
     try:
         db_path = Path("streaming_logs.db")
@@ -110,6 +223,7 @@ def init_database():
     except Exception as e:
         st.error(f"Database initialization error: {e}")
 
+@timed("db")
 def save_channel_auth(channel_name, channel_id, auth_data):
     try:
         conn = sqlite3.connect("streaming_logs.db")
@@ -125,6 +239,7 @@ def save_channel_auth(channel_name, channel_id, auth_data):
     except Exception as e:
         return False
 
+@timed("db")
 def load_saved_channels():
     try:
         conn = sqlite3.connect("streaming_logs.db")
@@ -136,6 +251,7 @@ def load_saved_channels():
     except Exception as e:
         return []
 
+@timed("db")
 def update_channel_last_used(channel_name):
     try:
         conn = sqlite3.connect("streaming_logs.db")
@@ -145,6 +261,7 @@ def update_channel_last_used(channel_name):
         conn.close()
     except: pass
 
+@timed("db")
 def log_to_database(session_id, log_type, message, video_file=None, stream_key=None, channel_name=None):
     try:
         conn = sqlite3.connect("streaming_logs.db")
@@ -157,6 +274,7 @@ def log_to_database(session_id, log_type, message, video_file=None, stream_key=N
         conn.close()
     except: pass
 
+@timed("db")
 def get_logs_from_database(session_id=None, limit=100):
     try:
         conn = sqlite3.connect("streaming_logs.db")
@@ -170,6 +288,7 @@ def get_logs_from_database(session_id=None, limit=100):
         return logs
     except: return []
 
+@timed("db")
 def save_streaming_session(session_id, video_file, stream_title, stream_description, tags, category, privacy_status, made_for_kids, channel_name):
     try:
         conn = sqlite3.connect("streaming_logs.db")
@@ -195,6 +314,7 @@ def generate_auth_url(client_config):
             f"redirect_uri={urllib.parse.quote(client_config['redirect_uris'][0])}&"
             f"scope={urllib.parse.quote(' '.join(scopes))}&response_type=code&access_type=offline&prompt=consent")
 
+@timed("api")
 def exchange_code_for_tokens(client_config, auth_code):
     try:
         token_data = {
@@ -217,6 +337,7 @@ def validate_channel_config(config):
     if not isinstance(config['channels'], list): return False, "Channels must be list"
     return True, "Valid"
 
+@timed("api")
 def create_youtube_service(credentials_dict):
     try:
         if 'token' in credentials_dict:
@@ -234,6 +355,7 @@ def create_youtube_service(credentials_dict):
     except: return None
 
 # --- YOUTUBE API FUNCTIONS ---
+@timed("api")
 def get_stream_key_only(service):
     try:
         req = service.liveStreams().insert(
@@ -253,6 +375,7 @@ def get_stream_key_only(service):
         st.error(f"Error getting stream key: {e}")
         return None
 
+@timed("api")
 def get_channel_info(service, channel_id=None):
     try:
         if channel_id:
@@ -262,6 +385,7 @@ def get_channel_info(service, channel_id=None):
         return req.execute().get('items', [])
     except: return []
 
+@timed("api")
 def create_live_stream(service, title, description, scheduled_time, tags=None, category_id="20", privacy="public", made_for_kids=False):
     try:
         # 1. Stream
@@ -314,12 +438,14 @@ def create_live_stream(service, title, description, scheduled_time, tags=None, c
         st.error(f"Error creating live stream: {e}")
         return None
 
+@timed("api")
 def get_existing_broadcasts(service, max_results=10):
     try:
         req = service.liveBroadcasts().list(part="snippet,status,contentDetails", mine=True, maxResults=max_results, broadcastStatus="all")
         return req.execute().get('items', [])
     except: return []
 
+@timed("api")
 def get_broadcast_stream_key(service, broadcast_id):
     try:
         b_resp = service.liveBroadcasts().list(part="contentDetails", id=broadcast_id).execute()
@@ -334,15 +460,84 @@ def get_broadcast_stream_key(service, broadcast_id):
         return None
     except: return None
 
-# --- OPTIMIZED FFMPEG (FIX LOADING SCREEN) ---
-def run_ffmpeg(video_path, stream_key, is_shorts, log_callback, rtmp_url=None, session_id=None):
-    output_url = rtmp_url or f"rtmp://a.rtmp.youtube.com/live2/{stream_key}"
-    
+# --- ADAPTIVE BITRATE LADDER ---
+# Profil dari kualitas tertinggi ke terendah. Resolusi landscape; mode Shorts memakai ukuran yang dibalik.
+BITRATE_LADDER = [
+    {"name": "720p-high", "width": 1280, "height": 720, "bitrate": 2000, "maxrate": 2500, "bufsize": 5000},
+    {"name": "720p-low",  "width": 1280, "height": 720, "bitrate": 1200, "maxrate": 1500, "bufsize": 3000},
+    {"name": "480p",      "width": 854,  "height": 480, "bitrate": 800,  "maxrate": 1000, "bufsize": 2000},
+    {"name": "360p",      "width": 640,  "height": 360, "bitrate": 500,  "maxrate": 600,  "bufsize": 1200},
+]
+
+ABR_WINDOW = 6            # Jumlah sampel (~0.5 detik/sampel) untuk menghitung speed saat ini
+ABR_DOWN_SPEED = 0.95     # Turun profil jika speed saat ini di bawah ini...
+ABR_DOWN_HOLD = 10        # ...terus-menerus selama sekian detik (~3 window), bukan satu window
+ABR_UP_HOLD = 60          # Detik link harus sehat sebelum naik profil
+ABR_UP_HOLD_MAX = 960     # Batas hold setelah dilipatgandakan karena naik profil gagal
+ABR_COOLDOWN = 20         # Detik minimal antar switch
+ABR_STALL_POLL = 1.0      # ffmpeg berhenti print stats saat RTMP macet; cek tiap detik
+ABR_MAX_RETRIES = 5       # Batas respawn berturut-turut saat ffmpeg exit sendiri
+ABR_RETRY_DELAY = 2       # Detik jeda sebelum respawn
+ABR_RESUME_HOURS = 24     # Panjang playlist resume (file diulang) sebelum respawn ulang
+
+FFMPEG_TIME_RE = re.compile(r'time=\s*(\d+):(\d+):([\d.]+)')
+
+def parse_ffmpeg_time(line):
+    """Return posisi output (detik) dari baris stats ffmpeg, atau None."""
+    m = FFMPEG_TIME_RE.search(line)
+    if not m: return None
+    h, mnt, sec = m.groups()
+    return int(h) * 3600 + int(mnt) * 60 + float(sec)
+
+def window_speed(samples):
+    """Speed saat ini = selisih out_time / selisih waktu nyata dalam window (bukan rata-rata sejak start)."""
+    if len(samples) < ABR_WINDOW: return None
+    wall = samples[-1][0] - samples[0][0]
+    return (samples[-1][1] - samples[0][1]) / wall if wall > 0 else None
+
+def choose_ladder_step(level, ladder_size, speed, slow_since, healthy_since, now, up_hold=None):
+    """Return (level_baru, alasan) berdasarkan speed saat ini, atau (level, None) jika tetap.
+    up_hold: {rung: detik} hold khusus per rung tujuan naik (default ABR_UP_HOLD)."""
+    if speed is None:
+        return level, None
+    if level < ladder_size - 1 and slow_since is not None and now - slow_since >= ABR_DOWN_HOLD:
+        return level + 1, f"speed < {ABR_DOWN_SPEED}x for {int(now - slow_since)}s (current {speed:.2f}x)"
+    hold = (up_hold or {}).get(level - 1, ABR_UP_HOLD)
+    if level > 0 and healthy_since is not None and now - healthy_since >= hold:
+        return level - 1, f"link healthy for {int(now - healthy_since)}s (current speed {speed:.2f}x)"
+    return level, None
+
+def probe_duration(path):
+    try:
+        out = subprocess.run(["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+                             capture_output=True, text=True, timeout=30).stdout.strip()
+        return float(out) if out else None
+    except: return None
+
+def write_resume_playlist(video_path, position, duration):
+    """Playlist concat: sisa file dari position, lalu file utuh berulang. Aman untuk timestamp,
+    tidak seperti -ss + -stream_loop yang menggeser pts di setiap loop."""
+    path = "'{}'".format(os.path.abspath(video_path).replace("'", "'\\''"))
+    repeats = min(10000, int(ABR_RESUME_HOURS * 3600 / duration) + 1)
+    with tempfile.NamedTemporaryFile("w", delete=False, suffix=".txt") as f:
+        f.write(f"ffconcat version 1.0\nfile {path}\ninpoint {position:.3f}\n")
+        f.write(f"file {path}\n" * repeats)
+        return f.name
+
+def enqueue_output(stream, q):
+    for line in stream: q.put(line)
+    q.put(None)
+
+def build_ffmpeg_cmd(video_path, output_url, is_shorts, profile, resume_playlist=None):
+    if resume_playlist:
+        # Lanjut dari posisi terakhir saat switch profil (lihat write_resume_playlist)
+        source = ["-f", "concat", "-safe", "0", "-i", resume_playlist]
+    else:
+        source = ["-stream_loop", "-1", "-i", video_path]  # Loop selamanya
     cmd = [
         "ffmpeg", 
         "-re", 
-        "-stream_loop", "-1",  # Loop selamanya
-        "-i", video_path,      # Input file
+        *source,               # Input file
         
         # --- VIDEO SETTINGS ---
         "-c:v", "libx264",     # Codec Video
@@ -351,9 +546,9 @@ def run_ffmpeg(video_path, stream_key, is_shorts, log_callback, rtmp_url=None, s
         "-pix_fmt", "yuv420p", # <--- WAJIB! Agar YouTube bisa baca gambarnya
         "-r", "30",            # Paksa 30 FPS stabil
         "-g", "60",            # Keyframe tiap 2 detik (Wajib YouTube: 2 * 30fps = 60)
-        "-b:v", "2000k",       # Bitrate 2000kbps (Cukup untuk 720p)
-        "-maxrate", "2500k",   # Batas atas bitrate
-        "-bufsize", "5000k",   # Buffer size
+        "-b:v", f"{profile['bitrate']}k",  # Bitrate sesuai profil ladder
+        "-maxrate", f"{profile['maxrate']}k", # Batas atas bitrate
+        "-bufsize", f"{profile['bufsize']}k", # Buffer size
         
         # --- AUDIO SETTINGS ---
         "-c:a", "aac",         # Codec Audio
@@ -364,25 +559,273 @@ def run_ffmpeg(video_path, stream_key, is_shorts, log_callback, rtmp_url=None, s
         "-f", "flv",           # Format FLV untuk RTMP
     ]
     
-    # Skala Resolusi (Downscale ke 720p biar server kuat)
+    # Skala Resolusi sesuai profil ladder
     if is_shorts:
          # Mode Shorts (Vertikal)
-         cmd.extend(["-vf", "scale=-2:1280,crop=720:1280:0:0"]) 
+         cmd.extend(["-vf", f"scale=-2:{profile['width']},crop={profile['height']}:{profile['width']}:0:0"]) 
     else:
-         # Mode Landscape (720p)
-         cmd.extend(["-vf", "scale=1280:-2"]) 
+         # Mode Landscape
+         cmd.extend(["-vf", f"scale={profile['width']}:-2"]) 
 
     cmd.append(output_url)
+    return cmd
+
+# --- OPTIMIZED FFMPEG (FIX LOADING SCREEN) ---
+def run_ffmpeg(video_path, stream_key, is_shorts, log_callback, rtmp_url=None, session_id=None, ladder=None, stop_event=None):
+    output_url = rtmp_url or f"rtmp://a.rtmp.youtube.com/live2/{stream_key}"
+    ladder = ladder or BITRATE_LADDER
+    stop_event = stop_event or threading.Event()
+    duration = probe_duration(video_path)
+    level = 0
+    position = 0.0  # Posisi di file sumber (detik), untuk resume setelah switch
+    up_hold = {}    # Hold naik per rung, dilipatgandakan jika naik ke rung itu gagal
+    last_up = None  # Rung hasil step up terakhir, jika belum ada switch lain sesudahnya
+    retries = 0
+    
+    def backoff_step_up(rung):
+        # Naik ke rung ini baru saja gagal: tunggu lebih lama sebelum mencoba lagi
+        up_hold[rung] = min(up_hold.get(rung, ABR_UP_HOLD) * 2, ABR_UP_HOLD_MAX)
+        return f", next step up to {ladder[rung]['name']} after {up_hold[rung]}s"
+    
+    def log_switch(msg):
+        log_callback(msg)
+        log_to_database(session_id, "ABR", msg, video_file=video_path, stream_key=stream_key)
     
     start_msg = f"🚀 Starting FIX Stream (YUV420P) for {video_path}..."
     log_callback(start_msg)
     
     try:
-        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        while not stop_event.is_set():
+            profile = ladder[level]
+            playlist = write_resume_playlist(video_path, position, duration) if position and duration else None
+            log_callback(f"🎚️ Profile: {profile['name']} ({profile['bitrate']}k) @ {position:.1f}s")
+            with perf_span("ffmpeg.spawn", "ffmpeg"):
+                process = subprocess.Popen(build_ffmpeg_cmd(video_path, output_url, is_shorts, profile, playlist), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            
+            # Baca stdout di thread terpisah agar controller tetap jalan saat ffmpeg macet (tidak print stats)
+            lines = queue.Queue()
+            threading.Thread(target=enqueue_output, args=(process.stdout, lines), daemon=True).start()
+            
+            start_position = position
+            spawned_at = last_switch = time.time()
+            out_time = 0.0
+            samples = []
+            slow_since = healthy_since = None
+            switch_to = None
+            last_error = ""
+            
+            while True:
+                if stop_event.is_set():
+                    process.terminate()
+                    break
+                try:
+                    line = lines.get(timeout=ABR_STALL_POLL)
+                except queue.Empty:
+                    line = ""
+                if line is None: break
+                
+                # Filter log biar tidak spam, tapi tampilkan error/frame
+                if "frame=" in line or "Error" in line or "kb/s" in line: 
+                    log_callback(line.strip())
+                if "rror" in line: last_error = line.strip()
+                
+                t = parse_ffmpeg_time(line)
+                if t is not None: out_time = t
+                elif line: continue  # Baris non-stats; timeout (line kosong) dihitung sebagai sampel macet
+                now = time.time()
+                samples = (samples + [(now, out_time)])[-ABR_WINDOW:]
+                position = start_position + out_time
+                if duration: position %= duration
+                
+                speed = window_speed(samples)
+                if speed is None: continue
+                if speed < ABR_DOWN_SPEED:
+                    healthy_since = None
+                    if slow_since is None: slow_since = now
+                else:
+                    slow_since = None
+                    if healthy_since is None: healthy_since = now
+                
+                if now - last_switch < ABR_COOLDOWN: continue
+                new_level, reason = choose_ladder_step(level, len(ladder), speed, slow_since, healthy_since, now, up_hold)
+                if reason:
+                    if new_level > level:
+                        if last_up == level: reason += backoff_step_up(level)
+                        last_up = None
+                        log_switch(f"⬇️ Step down {profile['name']} → {ladder[new_level]['name']}: {reason}")
+                    else:
+                        last_up = new_level
+                        log_switch(f"⬆️ Step up {profile['name']} → {ladder[new_level]['name']}: {reason}")
+                    switch_to = new_level
+                    process.terminate()
+                    break
+                    
+            process.wait()
+            if playlist and os.path.exists(playlist): os.remove(playlist)
+            if stop_event.is_set(): break  # Stop/Kill dari user
+            
+            if switch_to is None:
+                # ffmpeg exit sendiri (mis. RTMP write error): turun satu rung lalu respawn, dengan batas retry
+                if time.time() - spawned_at >= ABR_UP_HOLD: retries = 0
+                retries += 1
+                if retries > ABR_MAX_RETRIES:
+                    log_switch(f"❌ ffmpeg exited {retries - 1} times in a row, giving up")
+                    break
+                switch_to = min(level + 1, len(ladder) - 1) if process.returncode != 0 else level
+                backoff = backoff_step_up(level) if switch_to > level and last_up == level else ""
+                last_up = None
+                log_switch(f"🔁 ffmpeg exited (code {process.returncode}) on {profile['name']} → respawn {ladder[switch_to]['name']} "
+                           f"({retries}/{ABR_MAX_RETRIES}){': ' + last_error if last_error else ''}{backoff}")
+                if stop_event.wait(ABR_RETRY_DELAY): break
+            level = switch_to
+        log_callback("✅ Streaming stopped")
+        
+    except Exception as e:
+        log_callback(f"❌ FFmpeg Error: {e}")
+    finally:
+        log_callback("⏹️ Session ended")
+
+# --- STILL IMAGE + AUDIO MODE (CPU RENDAH) ---
+STILL_FPS = 2              # Frame rate internal untuk gambar statis
+STILL_GOP_SECONDS = 4      # Batas maksimal keyframe interval YouTube
+
+def probe_audio_params(path):
+    """Return (codec, sample_rate, channel_layout) stream audio pertama via ffprobe, atau None."""
+    try:
+        out = subprocess.run(["ffprobe", "-v", "error", "-select_streams", "a:0",
+                              "-show_entries", "stream=codec_name,sample_rate,channel_layout,channels",
+                              "-of", "json", path], capture_output=True, text=True, timeout=30).stdout
+        streams = json.loads(out).get('streams', [])
+        if not streams: return None
+        s = streams[0]
+        return s.get('codec_name'), s.get('sample_rate'), s.get('channel_layout') or s.get('channels')
+    except: return None
+
+def can_copy_audio(audio_paths):
+    # Copy hanya jika semua file AAC dengan parameter identik (FLV & concat demuxer mensyaratkan ini)
+    params = [probe_audio_params(p) for p in audio_paths]
+    return params[0] is not None and params[0][0] == "aac" and all(p == params[0] for p in params)
+
+def build_still_ffmpeg_cmd(image_path, audio_input, output_url, is_shorts, copy_audio):
+    size = "720:1280" if is_shorts else "1280:720"
+    cmd = [
+        "ffmpeg",
+        "-re", "-loop", "1", "-framerate", str(STILL_FPS), "-i", image_path,  # Gambar diulang terus
+        "-re", *audio_input,                                                  # Audio / playlist (loop)
+        "-map", "0:v", "-map", "1:a",
+        
+        # --- VIDEO SETTINGS ---
+        "-c:v", "libx264",
+        "-preset", "veryfast",
+        "-tune", "stillimage",  # Optimasi untuk gambar diam
+        "-pix_fmt", "yuv420p",
+        "-vf", f"scale={size}:force_original_aspect_ratio=decrease,pad={size}:(ow-iw)/2:(oh-ih)/2",
+        "-r", str(STILL_FPS),
+        "-g", str(STILL_FPS * STILL_GOP_SECONDS),  # GOP panjang, tetap dalam batas YouTube
+        "-x264-params", "scenecut=0",
+        "-b:v", "300k", "-maxrate", "500k", "-bufsize", "1000k",
+    ]
+    
+    # --- AUDIO SETTINGS ---
+    if copy_audio: cmd.extend(["-c:a", "copy"])  # AAC langsung diteruskan tanpa encode ulang
+    else: cmd.extend(["-c:a", "aac", "-b:a", "128k", "-ar", "44100"])
+    
+    cmd.extend(["-f", "flv", output_url])
+    return cmd
+
+def run_still_ffmpeg(image_path, audio_paths, stream_key, is_shorts, log_callback, rtmp_url=None, session_id=None):
+    output_url = rtmp_url or f"rtmp://a.rtmp.youtube.com/live2/{stream_key}"
+    playlist_path = None
+    
+    if len(audio_paths) > 1:
+        # Playlist: pakai concat demuxer agar semua lagu jalan dalam satu proses
+        with tempfile.NamedTemporaryFile("w", delete=False, suffix=".txt") as f:
+            for path in audio_paths:
+                f.write("file '{}'\n".format(os.path.abspath(path).replace("'", "'\\''")))
+            playlist_path = f.name
+        audio_input = ["-stream_loop", "-1", "-f", "concat", "-safe", "0", "-i", playlist_path]
+    else:
+        audio_input = ["-stream_loop", "-1", "-i", audio_paths[0]]
+    copy_audio = can_copy_audio(audio_paths)
+    
+    log_callback(f"🖼️ Starting Still Image Stream: {image_path} + {len(audio_paths)} audio file(s)...")
+    log_callback(f"🎵 Audio: {'copy (AAC passthrough)' if copy_audio else 'encode AAC 128k'}")
+    
+    try:
+        with perf_span("ffmpeg.spawn", "ffmpeg"):
+            process = subprocess.Popen(build_still_ffmpeg_cmd(image_path, audio_input, output_url, is_shorts, copy_audio), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        
+        for line in process.stdout:
+            if "frame=" in line or "Error" in line or "kb/s" in line: 
+                log_callback(line.strip())
+                
+        process.wait()
+        log_callback("✅ Streaming stopped")
+        
+    except Exception as e:
+        log_callback(f"❌ FFmpeg Error: {e}")
+    finally:
+        if playlist_path and os.path.exists(playlist_path): os.remove(playlist_path)
+        log_callback("⏹️ Session ended")
+
+# --- MULTI-RENDITION (SATU DECODE, BANYAK OUTPUT) ---
+CROP_POSITIONS = {"left": "0", "center": "(iw-ow)/2", "right": "iw-ow"}
+RENDITION_KINDS = {
+    # kind: (filter, profile ladder)
+    "landscape": ("scale=1280:-2", BITRATE_LADDER[0]),
+    "shorts": ("scale=720:1280:force_original_aspect_ratio=increase,crop=720:1280:{x}:(ih-oh)/2", BITRATE_LADDER[0]),
+    "backup": ("scale=640:-2", BITRATE_LADDER[-1]),
+}
+
+def build_multi_ffmpeg_cmd(video_path, renditions):
+    n = len(renditions)
+    # Decode sekali, lalu split frame ke tiap cabang filter
+    graph = [f"[0:v]split={n}" + "".join(f"[s{i}]" for i in range(n))]
+    for i, r in enumerate(renditions):
+        vf = RENDITION_KINDS[r['kind']][0].format(x=CROP_POSITIONS[r.get('crop', 'center')])
+        graph.append(f"[s{i}]{vf}[v{i}]")
+    
+    cmd = [
+        "ffmpeg",
+        "-re",
+        "-stream_loop", "-1",
+        "-i", video_path,
+        "-filter_complex", ";".join(graph),
+    ]
+    for i in range(n): cmd.extend(["-map", f"[v{i}]"])
+    cmd.extend(["-map", "0:a?"])  # Audio di-encode sekali, dipakai semua rendition
+    
+    # --- VIDEO SETTINGS (sama untuk semua rendition) ---
+    cmd.extend(["-c:v", "libx264", "-preset", "ultrafast", "-tune", "zerolatency",
+                "-pix_fmt", "yuv420p", "-r", "30", "-g", "60"])
+    for i, r in enumerate(renditions):
+        profile = RENDITION_KINDS[r['kind']][1]
+        cmd.extend([f"-b:v:{i}", f"{profile['bitrate']}k", f"-maxrate:v:{i}", f"{profile['maxrate']}k",
+                    f"-bufsize:v:{i}", f"{profile['bufsize']}k"])
+    
+    # --- AUDIO SETTINGS ---
+    cmd.extend(["-c:a", "aac", "-b:a", "128k", "-ar", "44100"])
+    
+    # --- FORMAT OUTPUT: tee, satu tujuan gagal/macet tidak mematikan yang lain ---
+    slaves = []
+    for i, r in enumerate(renditions):
+        url = r.get('rtmp_url') or f"rtmp://a.rtmp.youtube.com/live2/{r['stream_key']}"
+        slaves.append(f"[f=flv:select=\\'v:{i},a\\':onfail=ignore]{url}")
+    # use_fifo: tiap tujuan punya thread & antrian sendiri; ingest yang macet membuang paket-nya sendiri
+    # (drop_pkts_on_overflow) dan reconnect mulai dari keyframe, tanpa menahan rendition lain
+    cmd.extend(["-flags", "+global_header", "-f", "tee", "-use_fifo", "1",
+                "-fifo_options", "queue_size=300:drop_pkts_on_overflow=1:attempt_recovery=1:recovery_wait_time=2:restart_with_keyframe=1",
+                "|".join(slaves)])
+    return cmd
+
+def run_multi_ffmpeg(video_path, renditions, log_callback, session_id=None):
+    log_callback(f"🔀 Starting Multi-Output Stream for {video_path}: {', '.join(r['kind'] for r in renditions)}...")
+    
+    try:
+        with perf_span("ffmpeg.spawn", "ffmpeg"):
+            process = subprocess.Popen(build_multi_ffmpeg_cmd(video_path, renditions), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
         
-        # Baca log baris per baris
         for line in process.stdout:
-            # Filter log biar tidak spam, tapi tampilkan error/frame
             if "frame=" in line or "Error" in line or "kb/s" in line: 
                 log_callback(line.strip())
                 
@@ -430,7 +873,7 @@ def get_youtube_categories():
         "24": "Entertainment", "25": "News & Politics", "26": "Howto & Style", "27": "Education", "28": "Science & Technology"
     }
 
-def auto_start_streaming(video_path, stream_key, is_shorts=False, custom_rtmp=None, session_id=None):
+def auto_start_streaming(video_path, stream_key, is_shorts=False, custom_rtmp=None, session_id=None, ladder=None, audio_paths=None, renditions=None):
     if not video_path or not stream_key:
         st.error("❌ Video atau stream key tidak ditemukan!")
         return False
@@ -444,11 +887,25 @@ def auto_start_streaming(video_path, stream_key, is_shorts=False, custom_rtmp=No
         st.session_state['live_logs'].append(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
         if len(st.session_state['live_logs']) > 100: st.session_state['live_logs'] = st.session_state['live_logs'][-100:]
     
-    st.session_state['ffmpeg_thread'] = threading.Thread(
-        target=run_ffmpeg, 
-        args=(video_path, stream_key, is_shorts, log_callback, custom_rtmp or None, session_id), 
-        daemon=True
-    )
+    # Di-set oleh tombol Stop/Kill agar thread tidak spawn ffmpeg baru
+    stop_event = threading.Event()
+    st.session_state['stop_event'] = stop_event
+    
+    if renditions:
+        # Mode Multi-Output: satu proses, satu decode, banyak tujuan
+        target, args = run_multi_ffmpeg, (video_path, renditions, log_callback, session_id)
+    elif audio_paths:
+        # Mode Still Image: video_path adalah gambar cover
+        target, args = run_still_ffmpeg, (video_path, audio_paths, stream_key, is_shorts, log_callback, custom_rtmp or None, session_id)
+    else:
+        target, args = run_ffmpeg, (video_path, stream_key, is_shorts, log_callback, custom_rtmp or None, session_id, ladder, stop_event)
+    
+    # Buffer span background per session, ditentukan saat spawn
+    background = None
+    if st.session_state.get('perf_enabled', PROFILING_DEFAULT):
+        background = st.session_state.setdefault('perf_background', deque(maxlen=PROFILE_BACKGROUND))
+    
+    st.session_state['ffmpeg_thread'] = threading.Thread(target=run_with_perf, args=(target, args, background), daemon=True)
     st.session_state['ffmpeg_thread'].start()
     log_to_database(session_id, "INFO", f"Auto streaming started: {video_path}")
     return True
@@ -482,6 +939,13 @@ def auto_create_live_broadcast(service, use_custom_settings=True, custom_setting
 
 # --- MAIN APP UI ---
 def main():
+    perf_begin_rerun()
+    try:
+        render_app()
+    finally:
+        perf_end_rerun()
+
+def render_app():
     st.set_page_config(page_title="Advanced YouTube Live Streaming", page_icon="📺", layout="wide")
     init_database()
     
@@ -501,7 +965,8 @@ def main():
         # RAM MONITOR
         try:
             st.subheader("🖥️ Server Health")
-            ram = psutil.virtual_memory()
+            with perf_span("virtual_memory", "psutil"):
+                ram = psutil.virtual_memory()
             st.progress(ram.percent / 100)
             st.caption(f"RAM: {ram.percent}% ({ram.used/(1024**3):.1f} GB / {ram.total/(1024**3):.1f} GB)")
             if ram.percent > 90: st.error("⚠️ RAM CRITICAL!")
@@ -561,6 +1026,30 @@ def main():
             logs = "\n".join(st.session_state.get('live_logs', []))
             st.download_button("Save", logs, "logs.txt")
 
+        # Profiler (debug)
+        st.markdown("---")
+        st.subheader("⏱️ Profiler")
+        if st.checkbox("Enable Profiling", value=PROFILING_DEFAULT, key="perf_enabled"):
+            history = st.session_state.get('perf_history', [])
+            background = st.session_state.get('perf_background', [])
+            if history:
+                last = history[-1]
+                st.caption(f"Rerun sebelumnya: {last['total_ms']:.0f} ms (untracked {last['untracked_ms']:.0f} ms)")
+                st.dataframe(last['spans'], hide_index=True)
+                st.download_button("📥 Export JSON", json.dumps({"reruns": history, "background": list(background)}, indent=2), "perf_report.json")
+            if background:
+                with st.expander("Background spans (ffmpeg)"):
+                    st.dataframe(list(background)[-20:], hide_index=True)
+            
+            sampler = st.session_state.setdefault('perf_sampler', {"running": False, "path": None, "data": None})
+            sample_secs = st.number_input("Sampling window (detik)", 1, 300, 10)
+            if st.button("🔬 Start Sampling Profiler", disabled=sampler["running"]):
+                start_sampling_profiler(sampler, sample_secs)
+                st.info(f"Sampling {sample_secs}s...")
+            if sampler["data"]:
+                # Pakai bytes yang sudah di memori, tidak baca ulang file tiap rerun
+                st.download_button("📥 Download Flamegraph Profile", sampler["data"], os.path.basename(sampler["path"]))
+
     # --- MAIN CONTENT ---
     col1, col2 = st.columns([2, 1])
     
@@ -568,7 +1057,9 @@ def main():
         st.header("🎥 Video Source")
         
         # 1. Local Selection
-        video_files = [f for f in os.listdir('.') if f.endswith(('.mp4', '.flv', '.avi', '.mov', '.mkv'))]
+        with perf_span("listdir", "fs"):
+            local_files = os.listdir('.')  # Satu scan untuk video, gambar dan audio
+        video_files = [f for f in local_files if f.endswith(('.mp4', '.flv', '.avi', '.mov', '.mkv'))]
         selected_video = st.selectbox("Select Local Video", ["-- Select --"] + video_files)
         
         # 2. Smart Downloader (GDrive)
@@ -586,12 +1077,14 @@ def main():
                             file_id = gdrive_match.group(1)
                             if os.path.exists(save_path): os.remove(save_path)
                             url = f'https://drive.google.com/uc?id={file_id}'
-                            gdown.download(url, save_path, quiet=False, fuzzy=True)
+                            with perf_span("gdown.download", "api"):
+                                gdown.download(url, save_path, quiet=False, fuzzy=True)
                         else:
-                            resp = requests.get(url_input, stream=True)
-                            with open(save_path, 'wb') as f:
-                                for chunk in resp.iter_content(chunk_size=1024*1024):
-                                    if chunk: f.write(chunk)
+                            with perf_span("requests.download", "api"):
+                                resp = requests.get(url_input, stream=True)
+                                with open(save_path, 'wb') as f:
+                                    for chunk in resp.iter_content(chunk_size=1024*1024):
+                                        if chunk: f.write(chunk)
                         
                         if os.path.exists(save_path):
                             sz = os.path.getsize(save_path)/(1024*1024)
@@ -619,7 +1112,21 @@ def main():
         elif os.path.exists("downloaded_video.mp4"): active_video = "downloaded_video.mp4"
         elif uploaded_file: active_video = uploaded_file.name
         
-        if active_video and os.path.exists(active_video):
+        # 4. Still Image + Audio (musik/radio, CPU rendah)
+        st.markdown("---")
+        active_audio = None
+        with st.expander("🖼️ Still Image + Audio Mode"):
+            image_files = [f for f in local_files if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
+            audio_files = [f for f in local_files if f.lower().endswith(('.mp3', '.aac', '.m4a', '.wav', '.flac', '.ogg'))]
+            still_mode = st.checkbox("Aktifkan mode gambar statis", key="still_mode")
+            still_image = st.selectbox("Cover Image", ["-- Select --"] + image_files)
+            still_audio = st.multiselect("Audio / Playlist (urut)", audio_files)
+            st.caption("Video di-encode 2 FPS dengan tune stillimage; audio AAC dengan parameter sama diteruskan tanpa encode ulang.")
+        if still_mode and still_image != "-- Select --" and still_audio:
+            active_video, active_audio = still_image, still_audio
+            st.success(f"🖼️ Still Mode: **{still_image}** + {len(still_audio)} audio file(s)")
+        
+        elif active_video and os.path.exists(active_video):
             sz = os.path.getsize(active_video)/(1024*1024)
             st.success(f"🎬 Active: **{active_video}** ({sz:.2f} MB)")
             if sz < 1: st.warning("⚠️ File terlalu kecil (<1MB). Cek link Google Drive!")
@@ -660,7 +1167,7 @@ def main():
                 
                 live_info = auto_create_live_broadcast(service, use_custom, custom_sets, st.session_state['session_id'])
                 if live_info and active_video:
-                    auto_start_streaming(active_video, live_info['stream_key'], session_id=st.session_state['session_id'])
+                    auto_start_streaming(active_video, live_info['stream_key'], session_id=st.session_state['session_id'], ladder=st.session_state.get('stream_ladder'), audio_paths=active_audio)
                     st.rerun()
 
             # 3 Big Buttons
@@ -704,6 +1211,12 @@ def main():
             st.session_state['current_stream_key'] = stream_key_input
         # -------------------------------------------------------------
 
+        # Bitrate ladder per stream (profil teratas = kualitas awal)
+        ladder_names = st.multiselect("🎚️ Bitrate Ladder", [p['name'] for p in BITRATE_LADDER],
+                                      default=[p['name'] for p in BITRATE_LADDER],
+                                      help="Turun otomatis saat upload melambat, naik lagi saat pulih.")
+        st.session_state['stream_ladder'] = [p for p in BITRATE_LADDER if p['name'] in ladder_names] or None
+
         streaming = st.session_state.get('streaming', False)
         if streaming:
             st.error("🔴 LIVE")
@@ -715,6 +1228,7 @@ def main():
 
         # FORCE KILL BUTTON (PENTING)
         if st.button("💀 FORCE KILL FFMPEG", type="secondary"):
+            if 'stop_event' in st.session_state: st.session_state['stop_event'].set()
             os.system("pkill ffmpeg")
             st.session_state['streaming'] = False
             st.warning("All FFmpeg processes killed.")
@@ -725,12 +1239,28 @@ def main():
         if st.button("▶️ Start Stream", type="primary", disabled=streaming):
             key = st.session_state.get('current_stream_key')
             if active_video and key:
-                auto_start_streaming(active_video, key, session_id=st.session_state['session_id'])
+                auto_start_streaming(active_video, key, session_id=st.session_state['session_id'], ladder=st.session_state.get('stream_ladder'), audio_paths=active_audio)
                 st.rerun()
             else: st.error("No Video or Key!")
 
+        # Multi-Output: landscape + Shorts dari satu sumber
+        with st.expander("🔀 Multi-Output (Landscape + Shorts)"):
+            shorts_key = st.text_input("🔑 Shorts Stream Key", type="password", key="shorts_stream_key")
+            crop_pos = st.selectbox("Posisi Crop Vertikal", list(CROP_POSITIONS), index=1)
+            backup_key = st.text_input("🔑 Backup Stream Key (360p, opsional)", type="password", key="backup_stream_key")
+            if st.button("🔀 Start Multi-Output", disabled=streaming):
+                key = st.session_state.get('current_stream_key')
+                if active_video and key and shorts_key and not active_audio:
+                    renditions = [{"kind": "landscape", "stream_key": key},
+                                  {"kind": "shorts", "stream_key": shorts_key, "crop": crop_pos}]
+                    if backup_key: renditions.append({"kind": "backup", "stream_key": backup_key})
+                    auto_start_streaming(active_video, key, session_id=st.session_state['session_id'], renditions=renditions)
+                    st.rerun()
+                else: st.error("Butuh video (bukan still mode), stream key landscape dan Shorts!")
+
         if st.button("⏹️ Stop Stream", disabled=not streaming):
             st.session_state['streaming'] = False
+            if 'stop_event' in st.session_state: st.session_state['stop_event'].set()
             os.system("pkill ffmpeg")
             st.rerun()
 
@@ -740,7 +1270,8 @@ def main():
         logs_text = "\n".join(st.session_state.get('live_logs', [])[-20:])
         st.text_area("Live Output", logs_text, height=300)
         if st.checkbox("Auto-refresh Logs", value=streaming):
-            time.sleep(2)
+            with perf_span("autorefresh.sleep", "ui"):
+                time.sleep(2)
             st.rerun()
 
 if __name__ == '__main__':